@@ -1,17 +1,66 @@
+import atexit
+import functools
+import glob
 import json
+import math
 import time
 import subprocess
 import re
 import os
-from datetime import datetime
-from dataclasses import dataclass
-from typing import Dict, List, Optional
+import shutil
+import signal
+import queue
+import statistics
+import sys
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from operator import attrgetter
+from datetime import datetime, timedelta
+from dataclasses import dataclass, fields
+from typing import BinaryIO, Callable, Dict, List, Optional, Sequence, Tuple
+
+# amdsmi is imported once here; whether it actually works is checked when the monitor starts
+try:
+    import amdsmi
+    from amdsmi import AmdSmiClkType, AmdSmiTemperatureMetric, AmdSmiTemperatureType
+    # Temperature sensors tried in order by the per-API fallback
+    _AMDSMI_TEMP_TYPES = (
+        AmdSmiTemperatureType.EDGE,
+        AmdSmiTemperatureType.HOTSPOT,
+        AmdSmiTemperatureType.JUNCTION
+    )
+except (ImportError, OSError):
+    amdsmi = None
+
+# orjson is optional; when installed it speeds up rocm-smi output and data file (de)serialization
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    orjson = None
+    _json_loads = json.loads
+
+# numpy is optional; when installed, report percentiles use a linear-time selection over
+# the power columns (viewed in place, without copying) instead of a full sort
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 # Configuration from environment variables
 DEBUG_MODE = os.environ.get('AMD_GPU_MONITOR_DEBUG', '').lower() in ('true', '1', 'yes', 'on')
 QUIET_MODE = os.environ.get('AMD_GPU_MONITOR_QUIET', '').lower() in ('true', '1', 'yes', 'on')
 ENABLE_AMDSMI = not os.environ.get('AMD_GPU_MONITOR_DISABLE_AMDSMI', '').lower() in ('true', '1', 'yes', 'on')
 ENABLE_ROCM_SMI = not os.environ.get('AMD_GPU_MONITOR_DISABLE_ROCM_SMI', '').lower() in ('true', '1', 'yes', 'on')
+# Clock frequencies (sclk/mclk) are only collected on request; power, temperature, utilization, VRAM and energy always are
+EXTRA_FIELDS = os.environ.get('AMD_GPU_MONITOR_EXTRA_FIELDS', '').lower() in ('true', '1', 'yes', 'on')
+
+# With both backends available only the faster one is sampled, unless both are explicitly wanted
+FORCE_BOTH_METHODS = os.environ.get('AMD_GPU_MONITOR_FORCE_BOTH', '').lower() in ('true', '1', 'yes', 'on')
+
+# Back off the sampling interval while GPUs are idle (sampled power averages then weight busy periods more)
+ADAPTIVE_SAMPLING = os.environ.get('AMD_GPU_MONITOR_ADAPTIVE', '').lower() in ('true', '1', 'yes', 'on')
 
 # Sampling interval configuration
 try:
@@ -21,20 +70,133 @@ try:
 except ValueError:
     SAMPLING_INTERVAL = 1.0
 
-def debug_print(message: str):
-    """Print debug message only if debug mode is enabled"""
+# When sampling keeps overrunning, the interval is doubled up to this many times the configured one,
+# and halved again after this many consecutive on-time ticks that each took at most this share of
+# the halved interval (the headroom keeps it from flipping between two intervals)
+_MAX_OVERRUN_BACKOFF = 8
+_OVERRUN_RECOVERY_TICKS = 10
+_OVERRUN_RECOVERY_HEADROOM = 0.8
+
+# Optionally pin the sampling thread to one CPU core (Linux only) to cut scheduler jitter at short intervals
+try:
+    MONITOR_CPU = int(os.environ['AMD_GPU_MONITOR_CPU'])
+    if MONITOR_CPU < 0:
+        MONITOR_CPU = None
+except (KeyError, ValueError):
+    MONITOR_CPU = None
+
+# The sampling and consumer threads both print; each line goes out as one locked write so they never interleave
+_output_lock = threading.Lock()
+
+def _write_lines(text: str):
+    """Write text plus a newline to stdout in one call, serialized with the other threads"""
+    with _output_lock:
+        sys.stdout.write(text + '\n')
+
+def debug_print(message: str, *args):
+    """Print debug message only if debug mode is enabled; %-style args are only formatted then"""
     if DEBUG_MODE:
-        print(f"DEBUG: {message}")
+        _write_lines(f"DEBUG: {message % args if args else message}")
 
-def info_print(message: str):
-    """Print info message unless quiet mode is enabled"""
+def info_print(message: str, *args):
+    """Print info message unless quiet mode is enabled; %-style args are only formatted then"""
     if not QUIET_MODE:
-        print(message)
+        _write_lines(message % args if args else message)
+
+# Numeric strings as printed by the SMI tools, validated up front instead of catching float() errors
+_is_number = re.compile(r'\s*[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?\s*').fullmatch
+
+def _safe_float(value) -> Optional[float]:
+    """Safely convert value to float"""
+    # 'N/A' and other non-numeric strings are the common case on unsupported fields; reject without raising.
+    # NaN/inf are rejected too: they would poison the running sums and are not valid JSON
+    if isinstance(value, (int, float)):
+        return float(value) if math.isfinite(value) else None
+    if isinstance(value, str) and _is_number(value):
+        # Numeric strings can still overflow to inf, e.g. '1e400'
+        number = float(value)
+        return number if math.isfinite(number) else None
+    return None
+
+def _percentiles(values: Sequence[float]) -> Tuple[float, float, float]:
+    """Return the 50th, 95th and 99th percentiles of values (0 when empty)"""
+    if len(values) < 2:
+        value = values[0] if values else 0
+        return value, value, value
+    if numpy is not None and isinstance(values, array):
+        # numpy's default 'linear' method matches statistics' 'inclusive' interpolation
+        view = numpy.frombuffer(values, dtype=numpy.float32 if values.typecode == 'f' else numpy.float64)
+        p50, p95, p99 = numpy.percentile(view, (50, 95, 99))
+        return float(p50), float(p95), float(p99)
+    cuts = statistics.quantiles(values, n=100, method='inclusive')
+    return cuts[49], cuts[94], cuts[98]
 
-@dataclass
+# gpu_metrics_info keys for each GPUMetrics attribute, in order of preference
+# (edge temperature and average power/clocks are often N/A), and the cast applied to the value
+_AMDSMI_FIELDS = (
+    ('temperature_celsius', ('temperature_hotspot', 'temperature_edge', 'temperature_mem'), _safe_float),
+    ('power_watts', ('current_socket_power', 'average_socket_power'), _safe_float),
+    ('utilization_percent', ('average_gfx_activity',), _safe_float),
+    ('energy_accumulator', ('energy_accumulator',), int),
+    ('vram_usage_percent', ('vram_usage',), _safe_float),  # Newer amdsmi only; else a separate VRAM call
+)
+_AMDSMI_CLOCK_FIELDS = (
+    ('sclk_mhz', ('current_gfxclk', 'average_gfxclk_frequency'), _safe_float),
+    ('mclk_mhz', ('current_uclk', 'average_uclk_frequency'), _safe_float),
+)
+_AMDSMI_SAMPLED_FIELDS = _AMDSMI_FIELDS + _AMDSMI_CLOCK_FIELDS if EXTRA_FIELDS else _AMDSMI_FIELDS
+
+def _resolve_amdsmi_field_keys(gpu_metrics: Dict) -> Tuple[Tuple[str, Tuple[str, ...], Callable[[object], object], bool], ...]:
+    """Narrow each sampled attribute's key list to the first key this GPU reports; attributes
+    with no key reported yet keep their full list (the bool says whether it was narrowed)"""
+    resolved = []
+    for attr, keys, cast in _AMDSMI_SAMPLED_FIELDS:
+        for key in keys:
+            value = gpu_metrics.get(key)
+            if value is not None and value != 'N/A':
+                resolved.append((attr, (key,), cast, True))
+                break
+        else:
+            resolved.append((attr, keys, cast, False))
+    return tuple(resolved)
+
+# Fields a backend must report on every GPU to stand in for the others when only the fastest is sampled
+_PROBE_FIELDS = ('power_watts', 'temperature_celsius', 'energy_accumulator',
+                 *(('sclk_mhz', 'mclk_mhz') if EXTRA_FIELDS else ()))
+
+# Status line printed for each method on every tick
+_STATUS_FORMAT = "{}: {} GPUs, Total Power: {:.1f}W ({} with data)".format
+
+# rocm-smi --json fields copied straight onto GPUMetrics attributes
+_ROCM_SMI_FIELDS = (
+    ('power_watts', 'Current Socket Graphics Package Power (W)'),
+    ('temperature_celsius', 'Temperature (Sensor junction) (C)'),
+    ('utilization_percent', 'GPU use (%)'),
+    ('vram_usage_percent', 'GPU Memory Allocated (VRAM%)'),
+)
+_ROCM_SMI_CLOCK_FIELDS = (
+    ('sclk_mhz', 'current_gfxclk (MHz)'),
+    ('mclk_mhz', 'current_uclk (MHz)'),
+)
+# rocm-smi energy keys in order of preference, with the counter resolution (uJ per tick)
+# and how to parse the value; "Accumulated Energy (uJ)" is already converted to microjoules
+_ROCM_SMI_ENERGY_FIELDS = (
+    ('energy_accumulator', 15.259, int),
+    ('Energy counter', 15.259, int),
+    ('energy_accumulator (15.259uJ (2^-16))', 15.259, int),
+    ('Accumulated Energy (uJ)', 1.0, lambda value: int(float(value))),
+)
+# Ask rocm-smi only for the sections parsed above rather than every sensor; clocks are only asked for
+# when wanted: the current_* keys come from the --showmetrics dump, and --showclocks supplies the
+# "sclk/mclk clock speed:" strings used on ASICs whose dump lacks them
+_ROCM_SMI_FLAGS = ('--showpower', '--showtemp', '--showuse', '--showmemuse', '--showenergycounter',
+                   *(('--showmetrics', '--showclocks') if EXTRA_FIELDS else ()), '--json')
+
+@dataclass(slots=True)
 class GPUMetrics:
+    # Field order is the key order of the JSONL data files
+    timestamp_ns: int  # Wall-clock epoch nanoseconds (time.time_ns())
     gpu_id: int
-    timestamp: str
     power_watts: Optional[float] = None
     temperature_celsius: Optional[float] = None
     utilization_percent: Optional[float] = None
@@ -44,13 +206,278 @@ class GPUMetrics:
     energy_accumulator: Optional[int] = None
     counter_resolution: Optional[float] = None
 
+_GPU_METRICS_FIELDS = tuple(field.name for field in fields(GPUMetrics))
+
+if orjson is not None:
+    _metrics_json = orjson.dumps  # Serializes dataclasses natively
+else:
+    # Every field is a number or None, so a fixed template is valid JSON without building a dict
+    _METRICS_JSON_TEMPLATE = '{' + ','.join(f'"{name}":%s' for name in _GPU_METRICS_FIELDS) + '}'
+    _metrics_values = attrgetter(*_GPU_METRICS_FIELDS)
+    
+    def _metrics_json(metrics: GPUMetrics) -> bytes:
+        """GPUMetrics as one JSON object, in field order"""
+        return (_METRICS_JSON_TEMPLATE % tuple(
+            'null' if value is None else repr(value) for value in _metrics_values(metrics))).encode()
+
+class RunningStats:
+    """Count, mean, variance (Welford's method), min and max of a stream of values, updated in place in O(1) memory"""
+    __slots__ = ('count', 'mean', 'm2', 'minimum', 'maximum')
+    
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # Sum of squared deviations from the running mean
+        self.minimum = 0.0
+        self.maximum = 0.0
+    
+    def add(self, value: float):
+        if self.count:
+            if value < self.minimum:
+                self.minimum = value
+            elif value > self.maximum:
+                self.maximum = value
+        else:
+            self.minimum = self.maximum = value
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+    
+    @property
+    def stdev(self) -> float:
+        """Population standard deviation"""
+        return math.sqrt(self.m2 / self.count) if self.count else 0
+
+class MetricsHistory:
+    """Sampled values a report is built from: running aggregates for every metric, plus
+    the power columns kept whole for percentiles"""
+    def __init__(self):
+        self.gpu_ids = set()
+        # float32 holds sub-milliwatt precision at GPU power levels in half the memory of float64
+        self.power = array('f')  # Individual GPU power values
+        self.total_power = array('f')  # Total system power per tick
+        self.power_stats = RunningStats()
+        self.total_power_stats = RunningStats()
+        self.gpu_power_stats: Dict[int, RunningStats] = {}  # Per GPU
+        self.temperature = RunningStats()
+        self.utilization = RunningStats()
+        # Total system power per tick derived from energy counter deltas between adjacent ticks
+        self.energy_power_stats = RunningStats()
+        self._prev_energy: Dict[int, Tuple[int, int]] = {}  # gpu_id -> (energy_accumulator, tick_ns)
+        # Spacing between ticks as actually sampled (adaptive sampling and overrun back-off stretch it)
+        self.interval = RunningStats()
+        self._prev_tick_ns: Optional[int] = None
+    
+    def add(self, metrics_list: List[GPUMetrics], tick_ns: int):
+        """Append one tick of samples, taken at monotonic time tick_ns"""
+        # Spans come from the monotonic stamp, not the wall-clock timestamp_ns, so clock steps don't skew them
+        if metrics_list:
+            if self._prev_tick_ns is not None and tick_ns > self._prev_tick_ns:
+                self.interval.add((tick_ns - self._prev_tick_ns) / 1e9)
+            self._prev_tick_ns = tick_ns
+        tick_power = []
+        tick_energy_power = []
+        for metrics in metrics_list:
+            self.gpu_ids.add(metrics.gpu_id)
+            if metrics.energy_accumulator is not None and metrics.counter_resolution is not None:
+                prev = self._prev_energy.get(metrics.gpu_id)
+                self._prev_energy[metrics.gpu_id] = (metrics.energy_accumulator, tick_ns)
+                if prev is not None and metrics.energy_accumulator >= prev[0] and tick_ns > prev[1]:
+                    # uJ per ns is kW, hence the factor of 1000 to get W
+                    delta_uj = (metrics.energy_accumulator - prev[0]) * metrics.counter_resolution
+                    tick_energy_power.append(delta_uj * 1000 / (tick_ns - prev[1]))
+            if metrics.power_watts is not None:
+                tick_power.append(metrics.power_watts)
+                self.power_stats.add(metrics.power_watts)
+                gpu_stats = self.gpu_power_stats.get(metrics.gpu_id)
+                if gpu_stats is None:
+                    gpu_stats = self.gpu_power_stats[metrics.gpu_id] = RunningStats()
+                gpu_stats.add(metrics.power_watts)
+            if metrics.temperature_celsius is not None:
+                self.temperature.add(metrics.temperature_celsius)
+            if metrics.utilization_percent is not None:
+                self.utilization.add(metrics.utilization_percent)
+        
+        if tick_power:  # Only include if we have valid power data
+            tick_total = math.fsum(tick_power)
+            self.power.extend(tick_power)
+            self.total_power.append(tick_total)
+            self.total_power_stats.add(tick_total)
+        if tick_energy_power:
+            self.energy_power_stats.add(math.fsum(tick_energy_power))
+
+class AmdSmiSession:
+    """amdsmi library session, initialized once and shut down at exit"""
+    def __init__(self):
+        if amdsmi is None:
+            raise ImportError("amdsmi module is not installed")
+        amdsmi.amdsmi_init()
+        self._active = True
+        atexit.register(self.shutdown)
+        self.handles = amdsmi.amdsmi_get_processor_handles()
+    
+    def refresh_handles(self) -> list:
+        """Re-enumerate processor handles, e.g. after a GPU reset invalidated the old ones"""
+        self.handles = amdsmi.amdsmi_get_processor_handles()
+        return self.handles
+    
+    def shutdown(self):
+        """Release the amdsmi library (safe to call more than once)"""
+        if not self._active:
+            return
+        self._active = False
+        try:
+            amdsmi.amdsmi_shut_down()
+        except Exception as e:
+            debug_print(f"amdsmi shutdown failed: {e}")
+
+# Backend probes are memoized: tool availability does not change at runtime, and
+# amdsmi/pyrsmi are process-wide libraries that must only be initialized once.
+@functools.lru_cache(maxsize=None)
+def _open_amdsmi_session() -> Optional[AmdSmiSession]:
+    """Open the amdsmi session, or return None if no GPUs were detected"""
+    session = AmdSmiSession()
+    if not session.handles:
+        session.shutdown()
+        return None
+    return session
+
+@functools.lru_cache(maxsize=None)
+def _load_rocml():
+    """Import and initialize the pyrsmi ROCm SMI bindings"""
+    from pyrsmi import rocml
+    rocml.smi_initialize()
+    atexit.register(rocml.smi_shutdown)
+    return rocml
+
+@functools.lru_cache(maxsize=None)
+def _rocml_vram_total(gpu_id: int) -> int:
+    """VRAM size of a GPU via pyrsmi, queried once per GPU (failures raise and so are not cached)"""
+    total = _load_rocml().smi_get_device_memory_total(gpu_id)
+    if not total or total <= 0:
+        raise ValueError(f"invalid VRAM total {total}")
+    return total
+
+@functools.lru_cache(maxsize=None)
+def _rocm_smi_path() -> Optional[str]:
+    """Resolve the rocm-smi executable once, so spawning it skips the PATH search"""
+    return shutil.which('rocm-smi')
+
+@functools.lru_cache(maxsize=None)
+def _rocm_smi_cli_available() -> bool:
+    """Check whether the rocm-smi command line tool is installed (its version is only queried in debug mode)"""
+    path = _rocm_smi_path()
+    if path is None:
+        debug_print("rocm-smi not available: not found on PATH")
+        return False
+    if DEBUG_MODE:
+        try:
+            result = subprocess.run([path, '--version'], capture_output=True, text=True, timeout=5)
+            debug_print(f"rocm-smi found at {path}: {result.stdout.strip()}")
+        except Exception as e:
+            debug_print(f"rocm-smi --version failed: {e}")
+    return True
+
+# DRM class directory holding the amdgpu sysfs/hwmon files that rocm-smi itself reads
+_DRM_ROOT = '/sys/class/drm'
+
+class SysfsCard:
+    """amdgpu sysfs/hwmon files of one card, opened once and re-read with pread"""
+    def __init__(self, card_id: int, device_dir: str):
+        self.card_id = card_id
+        self.fds: Dict[str, int] = {}
+        hwmon_dirs = sorted(glob.glob(os.path.join(device_dir, 'hwmon', 'hwmon*')))
+        hwmon_dir = hwmon_dirs[0] if hwmon_dirs else device_dir
+        # First existing file wins; power is in uW, temperature in mC, clocks in Hz, energy in uJ
+        candidates = {
+            'power': ('power1_average', 'power1_input'),
+            'temperature': ('temp2_input', 'temp1_input'),  # junction, else edge
+            'sclk': ('freq1_input',),
+            'mclk': ('freq2_input',),
+            'energy': ('energy1_input',),
+        }
+        for name, files in candidates.items():
+            self._open(name, [os.path.join(hwmon_dir, f) for f in files])
+        for name in ('gpu_busy_percent', 'mem_info_vram_used', 'mem_info_vram_total'):
+            self._open(name, [os.path.join(device_dir, name)])
+        # VRAM size is fixed for the card; read it once instead of on every tick
+        self.vram_total = self.read_int('mem_info_vram_total')
+        fd = self.fds.pop('mem_info_vram_total', None)
+        if fd is not None:
+            os.close(fd)
+    
+    def _open(self, name: str, paths: List[str]):
+        for path in paths:
+            try:
+                self.fds[name] = os.open(path, os.O_RDONLY)
+                return
+            except OSError:
+                continue
+    
+    def read_int(self, name: str) -> Optional[int]:
+        """Read an integer attribute; sysfs regenerates the value on every read from offset 0"""
+        fd = self.fds.get(name)
+        if fd is None:
+            return None
+        try:
+            return int(os.pread(fd, 64, 0))
+        except (OSError, ValueError):
+            return None
+    
+    def close(self):
+        for fd in self.fds.values():
+            os.close(fd)
+        self.fds.clear()
+
+@functools.lru_cache(maxsize=None)
+def _open_sysfs_cards() -> Tuple[SysfsCard, ...]:
+    """Find amdgpu cards under _DRM_ROOT and open their metric files"""
+    cards = []
+    for card_dir in glob.glob(os.path.join(_DRM_ROOT, 'card[0-9]*')):
+        match = re.fullmatch(r'card(\d+)', os.path.basename(card_dir))
+        device_dir = os.path.join(card_dir, 'device')
+        if not match:
+            continue  # Connector entries such as card0-DP-1
+        try:
+            driver = os.path.basename(os.readlink(os.path.join(device_dir, 'driver')))
+        except OSError:
+            continue
+        if driver != 'amdgpu':
+            continue
+        card = SysfsCard(int(match.group(1)), device_dir)
+        if 'power' in card.fds:
+            cards.append(card)
+        else:
+            card.close()
+    
+    cards.sort(key=lambda c: c.card_id)
+    for card in cards:
+        atexit.register(card.close)
+    return tuple(cards)
+
 class AMDGPUMonitor:
     def __init__(self, output_dir: str = "gpu_monitoring_data", sampling_interval: Optional[float] = None):
         self.output_dir = output_dir
         self.sampling_interval = sampling_interval if sampling_interval is not None else SAMPLING_INTERVAL
         self.amdsmi_available = False
-        self.rocm_smi_available = False
+        self._rocm_smi_available: Optional[bool] = None
         self.gpu_handles = []
+        self._amdsmi: Optional[AmdSmiSession] = None
+        self._rocm_smi_source: Optional[str] = None  # 'sysfs', 'pyrsmi' or 'cli'
+        self._sysfs_cards: Tuple[SysfsCard, ...] = ()
+        self._rocml = None
+        self._rocml_device_count = 0
+        self._stop = threading.Event()  # Set to end a running monitor() after its current tick
+        self._gpu_metrics_failures: Dict[int, int] = {}  # amdsmi GPU index -> consecutive gpu_metrics_info failures
+        self._amdsmi_field_keys: Dict[int, Tuple] = {}  # amdsmi GPU index -> _resolve_amdsmi_field_keys result
+        # Handles are enumerated once; they are re-probed only when no GPU reports, with backoff between attempts
+        self._handle_reprobe_at = 0.0
+        self._handle_reprobe_backoff = 1.0
+        
+        # Adaptive sampling state
+        self._idle_streak = 0
+        self._prev_power: Dict[Tuple[str, int], float] = {}
         
         # Create output directory
         os.makedirs(output_dir, exist_ok=True)
@@ -63,334 +490,435 @@ class AMDGPUMonitor:
         # Check amdsmi
         if ENABLE_AMDSMI:
             try:
-                import amdsmi
-                amdsmi.amdsmi_init()
-                gpu_handles = amdsmi.amdsmi_get_processor_handles()
-                if gpu_handles:
+                session = _open_amdsmi_session()
+                if session is not None:
+                    self._amdsmi = session
                     self.amdsmi_available = True
-                    self.gpu_handles = gpu_handles
-                    info_print(f"amdsmi: {len(gpu_handles)} GPU(s) detected")
+                    self.gpu_handles = session.handles
+                    info_print(f"amdsmi: {len(session.handles)} GPU(s) detected")
                 else:
                     debug_print("amdsmi: No GPUs detected")
-                amdsmi.amdsmi_shut_down()
             except Exception as e:
                 debug_print(f"amdsmi not available: {e}")
         else:
             debug_print("amdsmi disabled via environment variable")
         
-        # Check rocm-smi
-        if ENABLE_ROCM_SMI:
-            try:
-                result = subprocess.run(['rocm-smi', '--version'], 
-                                      capture_output=True, text=True, timeout=5)
-                if result.returncode == 0:
-                    self.rocm_smi_available = True
-                    info_print("rocm-smi: Available")
-            except Exception as e:
-                debug_print(f"rocm-smi not available: {e}")
-        else:
+        # rocm-smi is probed lazily by rocm_smi_available, so runs that never use it never fork it
+    
+    @property
+    def rocm_smi_available(self) -> bool:
+        """Whether rocm-smi metrics can be collected (probed on first access)"""
+        if self._rocm_smi_available is None:
+            self._rocm_smi_available = self._check_rocm_smi()
+        return self._rocm_smi_available
+    
+    def _check_rocm_smi(self) -> bool:
+        """Pick the rocm-smi data source: amdgpu sysfs files, then the pyrsmi library, then the CLI"""
+        if not ENABLE_ROCM_SMI:
             debug_print("rocm-smi disabled via environment variable")
+            return False
+        
+        # Reading the sysfs files rocm-smi reads costs microseconds instead of a fork per sample
+        try:
+            self._sysfs_cards = _open_sysfs_cards()
+        except Exception as e:
+            debug_print(f"amdgpu sysfs not available: {e}")
+        if self._sysfs_cards:
+            self._rocm_smi_source = 'sysfs'
+            info_print(f"rocm-smi: sysfs, {len(self._sysfs_cards)} GPU(s) detected")
+            return True
+        
+        # Prefer the in-process ROCm SMI library over forking rocm-smi per sample
+        try:
+            rocml = _load_rocml()
+            self._rocml = rocml
+            self._rocml_device_count = rocml.smi_get_device_count()
+            self._rocm_smi_source = 'pyrsmi'
+            info_print(f"rocm-smi: pyrsmi library, {self._rocml_device_count} GPU(s) detected")
+            return True
+        except Exception as e:
+            debug_print(f"pyrsmi not available, falling back to rocm-smi CLI: {e}")
+        
+        if _rocm_smi_cli_available():
+            self._rocm_smi_source = 'cli'
+            info_print("rocm-smi: Available")
+            return True
+        return False
     
-    def _get_amdsmi_metrics(self) -> List[GPUMetrics]:
-        """Get metrics using amdsmi with latest API"""
+    def _get_amdsmi_metrics(self, timestamp_ns: Optional[int] = None) -> List[GPUMetrics]:
+        """Get metrics using amdsmi with latest API, stamped with timestamp_ns (default: now)"""
         if not self.amdsmi_available:
             return []
         
         try:
-            import amdsmi
-            amdsmi.amdsmi_init()
-            
-            # Re-get handles each time to avoid stale handles
-            current_handles = amdsmi.amdsmi_get_processor_handles()
             metrics_list = []
-            timestamp = datetime.now().isoformat()
+            if timestamp_ns is None:
+                timestamp_ns = time.time_ns()
             
-            for i, handle in enumerate(current_handles):
-                metrics = GPUMetrics(gpu_id=i, timestamp=timestamp)
+            # Handles were enumerated once by the amdsmi session in _check_monitoring_tools
+            for i, handle in enumerate(self.gpu_handles):
+                metrics = GPUMetrics(gpu_id=i, timestamp_ns=timestamp_ns)
                 
-                # Get comprehensive GPU metrics using the new unified function
-                try:
-                    gpu_metrics = amdsmi.amdsmi_get_gpu_metrics_info(handle)
-                    debug_print(f"amdsmi GPU {i}: Full metrics: {gpu_metrics}")
-                    
-                    # Temperature - use temperature_hotspot from gpu_metrics_info (edge often N/A)
-                    if 'temperature_hotspot' in gpu_metrics and gpu_metrics['temperature_hotspot'] is not None and gpu_metrics['temperature_hotspot'] != 'N/A':
-                        metrics.temperature_celsius = float(gpu_metrics['temperature_hotspot'])
-                        debug_print(f"amdsmi GPU {i}: Hotspot Temperature: {metrics.temperature_celsius}°C")
-                    elif 'temperature_edge' in gpu_metrics and gpu_metrics['temperature_edge'] is not None and gpu_metrics['temperature_edge'] != 'N/A':
-                        metrics.temperature_celsius = float(gpu_metrics['temperature_edge'])
-                        debug_print(f"amdsmi GPU {i}: Edge Temperature: {metrics.temperature_celsius}°C")
-                    elif 'temperature_mem' in gpu_metrics and gpu_metrics['temperature_mem'] is not None and gpu_metrics['temperature_mem'] != 'N/A':
-                        metrics.temperature_celsius = float(gpu_metrics['temperature_mem'])
-                        debug_print(f"amdsmi GPU {i}: Memory Temperature: {metrics.temperature_celsius}°C")
-                    
-                    # Power - use current_socket_power from gpu_metrics_info (average often N/A)
-                    if 'current_socket_power' in gpu_metrics and gpu_metrics['current_socket_power'] is not None and gpu_metrics['current_socket_power'] != 'N/A':
-                        metrics.power_watts = float(gpu_metrics['current_socket_power'])
-                        debug_print(f"amdsmi GPU {i}: Current Socket Power: {metrics.power_watts}W")
-                    elif 'average_socket_power' in gpu_metrics and gpu_metrics['average_socket_power'] is not None and gpu_metrics['average_socket_power'] != 'N/A':
-                        metrics.power_watts = float(gpu_metrics['average_socket_power'])
-                        debug_print(f"amdsmi GPU {i}: Average Socket Power: {metrics.power_watts}W")
-                    
-                    # GPU Activity - use average_gfx_activity from gpu_metrics_info
-                    if 'average_gfx_activity' in gpu_metrics and gpu_metrics['average_gfx_activity'] is not None:
-                        metrics.utilization_percent = float(gpu_metrics['average_gfx_activity'])
-                        debug_print(f"amdsmi GPU {i}: GFX Activity: {metrics.utilization_percent}%")
-                    
-                    # Clock frequencies - use current values (average often N/A)
-                    if 'current_gfxclk' in gpu_metrics and gpu_metrics['current_gfxclk'] is not None and gpu_metrics['current_gfxclk'] != 'N/A':
-                        metrics.sclk_mhz = float(gpu_metrics['current_gfxclk'])
-                        debug_print(f"amdsmi GPU {i}: Current GFXCLK: {metrics.sclk_mhz}MHz")
-                    elif 'average_gfxclk_frequency' in gpu_metrics and gpu_metrics['average_gfxclk_frequency'] is not None and gpu_metrics['average_gfxclk_frequency'] != 'N/A':
-                        metrics.sclk_mhz = float(gpu_metrics['average_gfxclk_frequency'])
-                        debug_print(f"amdsmi GPU {i}: Average GFXCLK: {metrics.sclk_mhz}MHz")
-                    
-                    if 'current_uclk' in gpu_metrics and gpu_metrics['current_uclk'] is not None and gpu_metrics['current_uclk'] != 'N/A':
-                        metrics.mclk_mhz = float(gpu_metrics['current_uclk'])
-                        debug_print(f"amdsmi GPU {i}: Current UCLK: {metrics.mclk_mhz}MHz")
-                    elif 'average_uclk_frequency' in gpu_metrics and gpu_metrics['average_uclk_frequency'] is not None and gpu_metrics['average_uclk_frequency'] != 'N/A':
-                        metrics.mclk_mhz = float(gpu_metrics['average_uclk_frequency'])
-                        debug_print(f"amdsmi GPU {i}: Average UCLK: {metrics.mclk_mhz}MHz")
-                    
-                    # Energy accumulator from gpu_metrics_info
-                    if 'energy_accumulator' in gpu_metrics and gpu_metrics['energy_accumulator'] is not None and gpu_metrics['energy_accumulator'] != 'N/A':
-                        metrics.energy_accumulator = int(gpu_metrics['energy_accumulator'])
-                        # According to debug output: counter_resolution is 15.3 uJ
-                        metrics.counter_resolution = 15.3
-                        debug_print(f"amdsmi GPU {i}: Energy Accumulator: {metrics.energy_accumulator} (15.3 uJ resolution)")
-                    
-                except Exception as e:
-                    debug_print(f"amdsmi GPU {i}: gpu_metrics_info failed: {e}")
-                    # Fallback to individual API calls if gpu_metrics_info fails
-                    
-                    # Fallback: Individual API calls for compatibility
-                    try:
-                        # Temperature using individual temp API
-                        from amdsmi import AmdSmiTemperatureType, AmdSmiTemperatureMetric
-                        temp_types = [
-                            AmdSmiTemperatureType.EDGE,
-                            AmdSmiTemperatureType.HOTSPOT,
-                            AmdSmiTemperatureType.JUNCTION
-                        ]
-                        
-                        for temp_type in temp_types:
-                            try:
-                                temp_result = amdsmi.amdsmi_get_temp_metric(handle, temp_type, AmdSmiTemperatureMetric.CURRENT)
-                                if temp_result is not None:
-                                    # AMD SMI temperature conversion: check if it's in millidegrees
-                                    if temp_result > 1000:  # Likely millidegrees (>1000 = >1°C)
-                                        temp_celsius = float(temp_result) / 1000.0
-                                    else:
-                                        temp_celsius = float(temp_result)
-                                    
-                                    if temp_celsius > 0:
-                                        metrics.temperature_celsius = temp_celsius
-                                        debug_print(f"amdsmi GPU {i}: Temperature (fallback): {temp_celsius}°C from {temp_type} (raw: {temp_result})")
-                                        break
-                            except Exception:
-                                continue
-                    except Exception as e:
-                        debug_print(f"amdsmi GPU {i}: Temperature fallback failed: {e}")
-                    
-                    # Fallback: Power using individual power API
+                # Get comprehensive GPU metrics using the new unified function, unless it kept
+                # failing on this GPU (unsupported by its driver/firmware): then only the individual APIs are used
+                if self._gpu_metrics_failures.get(i, 0) >= 3:
+                    self._get_amdsmi_fallback_metrics(i, handle, metrics)
+                else:
                     try:
-                        power_info = amdsmi.amdsmi_get_power_info(handle)
-                        # Use current_socket_power first (more reliable than average)
-                        power_val = (power_info.get("current_socket_power") or 
-                                    power_info.get("average_socket_power"))
-                        if power_val is not None and power_val != 'N/A':
-                            metrics.power_watts = float(power_val)
-                            debug_print(f"amdsmi GPU {i}: Power (fallback): {metrics.power_watts}W")
-                    except Exception as e:
-                        debug_print(f"amdsmi GPU {i}: Power fallback failed: {e}")
+                        gpu_metrics = amdsmi.amdsmi_get_gpu_metrics_info(handle)
+                        if DEBUG_MODE:
+                            debug_print(f"amdsmi GPU {i}: Full metrics: {gpu_metrics}")
                     
-                    # Fallback: GPU Activity using individual activity API
-                    try:
-                        activity = amdsmi.amdsmi_get_gpu_activity(handle)
-                        util_val = activity.get("gfx_activity")
-                        if util_val is not None:
-                            metrics.utilization_percent = float(util_val)
-                            debug_print(f"amdsmi GPU {i}: Utilization (fallback): {metrics.utilization_percent}%")
-                    except Exception as e:
-                        debug_print(f"amdsmi GPU {i}: Activity fallback failed: {e}")
+                        # Which key feeds each attribute is settled on the first sample, so later
+                        # ticks do one lookup per attribute instead of walking the preference lists
+                        field_keys = self._amdsmi_field_keys.get(i)
+                        if field_keys is None:
+                            field_keys = self._amdsmi_field_keys[i] = _resolve_amdsmi_field_keys(gpu_metrics)
+                        for attr, keys, cast, narrowed in field_keys:
+                            for key in keys:
+                                value = gpu_metrics.get(key)
+                                if value is not None and value != 'N/A':
+                                    setattr(metrics, attr, cast(value))
+                                    if DEBUG_MODE:
+                                        debug_print(f"amdsmi GPU {i}: {attr} = {value} (from {key})")
+                                    break
+                            else:
+                                if narrowed:
+                                    # The GPU stopped reporting this key; resolve the keys again next tick
+                                    self._amdsmi_field_keys.pop(i, None)
                     
-                    # Fallback: Clock frequencies using individual clock API
-                    if metrics.sclk_mhz is None:
-                        try:
-                            from amdsmi import AmdSmiClkType
-                            clock_info = amdsmi.amdsmi_get_clock_info(handle, AmdSmiClkType.GFX)
-                            if clock_info and 'clk' in clock_info:
-                                metrics.sclk_mhz = float(clock_info['clk'])
-                                debug_print(f"amdsmi GPU {i}: SCLK (fallback): {metrics.sclk_mhz}MHz")
-                        except Exception as e:
-                            debug_print(f"amdsmi GPU {i}: SCLK fallback failed: {e}")
+                        if metrics.energy_accumulator is not None:
+                            # According to debug output: counter_resolution is 15.3 uJ
+                            metrics.counter_resolution = 15.3
+                        self._gpu_metrics_failures.pop(i, None)
                     
-                    if metrics.mclk_mhz is None:
-                        try:
-                            from amdsmi import AmdSmiClkType
-                            clock_info = amdsmi.amdsmi_get_clock_info(handle, AmdSmiClkType.MEM)
-                            if clock_info and 'clk' in clock_info:
-                                metrics.mclk_mhz = float(clock_info['clk'])
-                                debug_print(f"amdsmi GPU {i}: MCLK (fallback): {metrics.mclk_mhz}MHz")
-                        except Exception as e:
-                            debug_print(f"amdsmi GPU {i}: MCLK fallback failed: {e}")
-                    try:
-                        energy = amdsmi.amdsmi_get_energy_count(handle)
-                        # From debug output: 'power' field contains the energy accumulator
-                        energy_val = (energy.get("power") or 
-                                    energy.get("energy_accumulator") or 
-                                    energy.get("counter"))
-                        if energy_val is not None and energy_val != 'N/A':
-                            metrics.energy_accumulator = int(energy_val)
-                        
-                        # Use actual resolution from API
-                        resolution = energy.get("counter_resolution")
-                        if resolution is not None and resolution != 'N/A':
-                            metrics.counter_resolution = float(resolution)
-                        else:
-                            metrics.counter_resolution = 15.3  # Default based on debug output
-                        debug_print(f"amdsmi GPU {i}: Energy (fallback): {metrics.energy_accumulator}, resolution: {metrics.counter_resolution}")
                     except Exception as e:
-                        debug_print(f"amdsmi GPU {i}: Energy fallback failed: {e}")
+                        debug_print(f"amdsmi GPU {i}: gpu_metrics_info failed: {e}")
+                        failures = self._gpu_metrics_failures[i] = self._gpu_metrics_failures.get(i, 0) + 1
+                        if failures == 3:
+                            info_print(f"amdsmi GPU {i}: gpu_metrics_info keeps failing, using the individual APIs from now on")
+                        self._get_amdsmi_fallback_metrics(i, handle, metrics)
                 
-                # VRAM usage (separate API call)
-                try:
-                    vram = amdsmi.amdsmi_get_gpu_vram_usage(handle)
-                    vram_used = vram.get("vram_used") 
-                    vram_total = vram.get("vram_total") or 1
-                    if vram_used is not None and vram_total > 0:
-                        metrics.vram_usage_percent = (float(vram_used) / float(vram_total)) * 100
-                        debug_print(f"amdsmi GPU {i}: VRAM: {metrics.vram_usage_percent}%")
-                except Exception as e:
-                    debug_print(f"amdsmi GPU {i}: VRAM failed: {e}")
+                # VRAM usage (separate API call, unless gpu_metrics_info already had it)
+                if metrics.vram_usage_percent is None:
+                    try:
+                        vram = amdsmi.amdsmi_get_gpu_vram_usage(handle)
+                        vram_used = vram.get("vram_used") 
+                        vram_total = vram.get("vram_total") or 1
+                        if vram_used is not None and vram_total > 0:
+                            metrics.vram_usage_percent = (float(vram_used) / float(vram_total)) * 100
+                            if DEBUG_MODE:
+                                debug_print(f"amdsmi GPU {i}: VRAM: {metrics.vram_usage_percent}%")
+                    except Exception as e:
+                        debug_print(f"amdsmi GPU {i}: VRAM failed: {e}")
                 
                 metrics_list.append(metrics)
             
-            amdsmi.amdsmi_shut_down()
+            if any(m.power_watts is not None or m.temperature_celsius is not None for m in metrics_list):
+                self._handle_reprobe_backoff = 1.0
+            else:
+                self._reprobe_amdsmi_handles()
             return metrics_list
             
         except Exception as e:
             debug_print(f"amdsmi general error: {e}")
-            try:
-                import amdsmi
-                amdsmi.amdsmi_shut_down()
-            except:
-                pass
+            self._reprobe_amdsmi_handles()
             return []
     
-    def _get_rocm_smi_metrics(self) -> List[GPUMetrics]:
-        """Get metrics using rocm-smi"""
+    def _reprobe_amdsmi_handles(self):
+        """Re-enumerate amdsmi handles after a tick where no GPU reported, at most once per backoff period"""
+        now = time.monotonic()
+        if now < self._handle_reprobe_at:
+            return
+        self._handle_reprobe_at = now + self._handle_reprobe_backoff
+        self._handle_reprobe_backoff = min(self._handle_reprobe_backoff * 2, 60.0)
+        try:
+            self.gpu_handles = self._amdsmi.refresh_handles()
+            self._gpu_metrics_failures.clear()
+            self._amdsmi_field_keys.clear()
+            debug_print(f"amdsmi: re-probed handles, {len(self.gpu_handles)} GPU(s)")
+        except Exception as e:
+            debug_print(f"amdsmi: handle re-probe failed: {e}")
+    
+    def _get_amdsmi_fallback_metrics(self, i: int, handle, metrics: GPUMetrics):
+        """Fill metrics from the individual amdsmi APIs, for GPUs without usable gpu_metrics_info"""
+        try:
+            # Temperature using individual temp API
+            for temp_type in _AMDSMI_TEMP_TYPES:
+                try:
+                    temp_result = _safe_float(amdsmi.amdsmi_get_temp_metric(handle, temp_type, AmdSmiTemperatureMetric.CURRENT))
+                    if temp_result is not None:
+                        # AMD SMI temperature conversion: check if it's in millidegrees
+                        if temp_result > 1000:  # Likely millidegrees (>1000 = >1°C)
+                            temp_celsius = temp_result / 1000.0
+                        else:
+                            temp_celsius = temp_result
+                        
+                        if temp_celsius > 0:
+                            metrics.temperature_celsius = temp_celsius
+                            if DEBUG_MODE:
+                                debug_print(f"amdsmi GPU {i}: Temperature (fallback): {temp_celsius}°C from {temp_type} (raw: {temp_result})")
+                            break
+                except Exception:
+                    continue
+        except Exception as e:
+            debug_print(f"amdsmi GPU {i}: Temperature fallback failed: {e}")
+        
+        # Fallback: Power using individual power API
+        try:
+            power_info = amdsmi.amdsmi_get_power_info(handle)
+            # Use current_socket_power first (more reliable than average); an idle
+            # GPU legitimately reads 0 W, so only a missing/N/A (or non-finite) value falls through
+            for key in ("current_socket_power", "average_socket_power"):
+                power_val = _safe_float(power_info.get(key))
+                if power_val is not None:
+                    metrics.power_watts = power_val
+                    if DEBUG_MODE:
+                        debug_print(f"amdsmi GPU {i}: Power (fallback): {metrics.power_watts}W from {key}")
+                    break
+        except Exception as e:
+            debug_print(f"amdsmi GPU {i}: Power fallback failed: {e}")
+        
+        # Fallback: GPU Activity using individual activity API
+        try:
+            activity = amdsmi.amdsmi_get_gpu_activity(handle)
+            util_val = _safe_float(activity.get("gfx_activity"))
+            if util_val is not None:
+                metrics.utilization_percent = util_val
+                if DEBUG_MODE:
+                    debug_print(f"amdsmi GPU {i}: Utilization (fallback): {metrics.utilization_percent}%")
+        except Exception as e:
+            debug_print(f"amdsmi GPU {i}: Activity fallback failed: {e}")
+        
+        # Fallback: Clock frequencies using individual clock API
+        if EXTRA_FIELDS and metrics.sclk_mhz is None:
+            try:
+                clock_info = amdsmi.amdsmi_get_clock_info(handle, AmdSmiClkType.GFX)
+                if clock_info and 'clk' in clock_info:
+                    metrics.sclk_mhz = _safe_float(clock_info['clk'])
+                    if DEBUG_MODE:
+                        debug_print(f"amdsmi GPU {i}: SCLK (fallback): {metrics.sclk_mhz}MHz")
+            except Exception as e:
+                debug_print(f"amdsmi GPU {i}: SCLK fallback failed: {e}")
+        
+        if EXTRA_FIELDS and metrics.mclk_mhz is None:
+            try:
+                clock_info = amdsmi.amdsmi_get_clock_info(handle, AmdSmiClkType.MEM)
+                if clock_info and 'clk' in clock_info:
+                    metrics.mclk_mhz = _safe_float(clock_info['clk'])
+                    if DEBUG_MODE:
+                        debug_print(f"amdsmi GPU {i}: MCLK (fallback): {metrics.mclk_mhz}MHz")
+            except Exception as e:
+                debug_print(f"amdsmi GPU {i}: MCLK fallback failed: {e}")
+        try:
+            energy = amdsmi.amdsmi_get_energy_count(handle)
+            # From debug output: 'power' field contains the energy accumulator
+            for key in ("power", "energy_accumulator", "counter"):
+                energy_val = energy.get(key)
+                if energy_val is not None and energy_val != 'N/A':
+                    metrics.energy_accumulator = int(energy_val)
+                    break
+            
+            # Use actual resolution from API
+            resolution = _safe_float(energy.get("counter_resolution"))
+            if resolution is not None:
+                metrics.counter_resolution = resolution
+            else:
+                metrics.counter_resolution = 15.3  # Default based on debug output
+            if DEBUG_MODE:
+                debug_print(f"amdsmi GPU {i}: Energy (fallback): {metrics.energy_accumulator}, resolution: {metrics.counter_resolution}")
+        except Exception as e:
+            debug_print(f"amdsmi GPU {i}: Energy fallback failed: {e}")
+    
+    def _get_rocml_metrics(self, timestamp_ns: Optional[int] = None) -> List[GPUMetrics]:
+        """Get metrics in-process using the pyrsmi ROCm SMI bindings, stamped with timestamp_ns (default: now)"""
+        rocml = self._rocml
+        metrics_list = []
+        if timestamp_ns is None:
+            timestamp_ns = time.time_ns()
+        
+        # The device count was taken once when pyrsmi was probed
+        for gpu_id in range(self._rocml_device_count):
+            metrics = GPUMetrics(gpu_id=gpu_id, timestamp_ns=timestamp_ns)
+            
+            # pyrsmi reports failed queries as -1
+            try:
+                power = rocml.smi_get_device_average_power(gpu_id)
+                if power is not None and power >= 0:
+                    metrics.power_watts = _safe_float(power)
+            except Exception as e:
+                debug_print(f"pyrsmi GPU {gpu_id}: Power failed: {e}")
+            
+            try:
+                util = rocml.smi_get_device_utilization(gpu_id)
+                if util is not None and util >= 0:
+                    metrics.utilization_percent = _safe_float(util)
+            except Exception as e:
+                debug_print(f"pyrsmi GPU {gpu_id}: Utilization failed: {e}")
+            
+            try:
+                vram_used = rocml.smi_get_device_memory_used(gpu_id)
+                vram_total = _rocml_vram_total(gpu_id)
+                if vram_used is not None and vram_used >= 0:
+                    metrics.vram_usage_percent = (float(vram_used) / float(vram_total)) * 100
+            except Exception as e:
+                debug_print(f"pyrsmi GPU {gpu_id}: VRAM failed: {e}")
+            
+            metrics_list.append(metrics)
+        
+        return metrics_list
+    
+    def _get_sysfs_metrics(self, timestamp_ns: Optional[int] = None) -> List[GPUMetrics]:
+        """Get metrics straight from the amdgpu sysfs/hwmon files, stamped with timestamp_ns (default: now)"""
+        metrics_list = []
+        if timestamp_ns is None:
+            timestamp_ns = time.time_ns()
+        
+        for card in self._sysfs_cards:
+            metrics = GPUMetrics(gpu_id=card.card_id, timestamp_ns=timestamp_ns)
+            
+            power_uw = card.read_int('power')
+            if power_uw is not None:
+                metrics.power_watts = power_uw / 1_000_000
+            
+            temp_mc = card.read_int('temperature')
+            if temp_mc is not None:
+                metrics.temperature_celsius = temp_mc / 1000
+            
+            util = card.read_int('gpu_busy_percent')
+            if util is not None:
+                metrics.utilization_percent = float(util)
+            
+            vram_used = card.read_int('mem_info_vram_used')
+            if vram_used is not None and card.vram_total:
+                metrics.vram_usage_percent = (vram_used / card.vram_total) * 100
+            
+            if EXTRA_FIELDS:
+                sclk_hz = card.read_int('sclk')
+                if sclk_hz is not None:
+                    metrics.sclk_mhz = sclk_hz / 1_000_000
+                mclk_hz = card.read_int('mclk')
+                if mclk_hz is not None:
+                    metrics.mclk_mhz = mclk_hz / 1_000_000
+            
+            energy_uj = card.read_int('energy')
+            if energy_uj is not None:
+                metrics.energy_accumulator = energy_uj
+                metrics.counter_resolution = 1.0  # Already in uJ
+            
+            metrics_list.append(metrics)
+        
+        return metrics_list
+    
+    def _get_rocm_smi_energy_snapshot(self) -> List[GPUMetrics]:
+        """Get the initial/final rocm-smi sample the energy report is computed from"""
+        metrics = self._get_rocm_smi_metrics()
+        if self._needs_cli_energy(metrics):
+            return self._get_rocm_smi_cli_metrics()
+        return metrics
+    
+    def _needs_cli_energy(self, metrics: List[GPUMetrics]) -> bool:
+        """Whether a rocm-smi energy snapshot has to come from the CLI instead of these metrics"""
+        # sysfs and pyrsmi usually expose no energy counter; the CLI is used then
+        return (self._rocm_smi_source != 'cli' and any(m.energy_accumulator is None for m in metrics)
+                and _rocm_smi_cli_available())
+    
+    def _spawn_rocm_smi(self) -> Optional[subprocess.Popen]:
+        """Start a rocm-smi JSON dump"""
+        # Output stays bytes: both JSON parsers take it as-is, so it is never decoded to str
+        try:
+            return subprocess.Popen((_rocm_smi_path(), *_ROCM_SMI_FLAGS),
+                                  stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except Exception as e:
+            debug_print(f"rocm-smi error: {e}")
+            return None
+    
+    def _get_rocm_smi_metrics(self, timestamp_ns: Optional[int] = None) -> List[GPUMetrics]:
+        """Get metrics using the selected rocm-smi data source, stamped with timestamp_ns (default: now)"""
         if not self.rocm_smi_available:
             return []
         
+        if self._rocm_smi_source == 'sysfs':
+            return self._get_sysfs_metrics(timestamp_ns)
+        if self._rocm_smi_source == 'pyrsmi':
+            return self._get_rocml_metrics(timestamp_ns)
+        return self._get_rocm_smi_cli_metrics(timestamp_ns)
+    
+    def _get_rocm_smi_cli_metrics(self, timestamp_ns: Optional[int] = None) -> List[GPUMetrics]:
+        """Get metrics using the rocm-smi CLI"""
+        proc = self._spawn_rocm_smi()
+        if proc is None:
+            return []
+        
         try:
-            result = subprocess.run(['rocm-smi', '--showall', '--json'],
-                                  capture_output=True, text=True, timeout=10)
+            stdout, stderr = proc.communicate(timeout=3)
             
-            if result.returncode != 0:
-                debug_print(f"rocm-smi failed: {result.stderr}")
+            if proc.returncode != 0:
+                debug_print(f"rocm-smi failed: {stderr.decode(errors='replace')}")
                 return []
             
-            data = json.loads(result.stdout)
+            data = _json_loads(stdout)
             metrics_list = []
-            timestamp = datetime.now().isoformat()
+            if timestamp_ns is None:
+                timestamp_ns = time.time_ns()
             
             for card_key, gpu_data in data.items():
-                if not card_key.startswith('card') or not isinstance(gpu_data, dict):
+                if not isinstance(gpu_data, dict) or not card_key.startswith('card'):
+                    continue
+                try:
+                    gpu_id = int(card_key[4:])
+                except ValueError:
                     continue
                 
-                gpu_id = int(card_key.replace('card', ''))
-                metrics = GPUMetrics(gpu_id=gpu_id, timestamp=timestamp)
+                metrics = GPUMetrics(gpu_id=gpu_id, timestamp_ns=timestamp_ns)
                 
                 # Parse metrics from rocm-smi output
-                metrics.power_watts = self._safe_float(gpu_data.get('Current Socket Graphics Package Power (W)'))
-                metrics.temperature_celsius = self._safe_float(gpu_data.get('Temperature (Sensor junction) (C)'))
-                metrics.utilization_percent = self._safe_float(gpu_data.get('GPU use (%)'))
-                metrics.vram_usage_percent = self._safe_float(gpu_data.get('GPU Memory Allocated (VRAM%)'))
+                for attr, key in _ROCM_SMI_FIELDS:
+                    setattr(metrics, attr, _safe_float(gpu_data.get(key)))
                 
-                # Clock frequencies - try multiple field names
-                # Method 1: Try standard field names
-                metrics.sclk_mhz = self._safe_float(gpu_data.get('current_gfxclk (MHz)'))
-                metrics.mclk_mhz = self._safe_float(gpu_data.get('current_uclk (MHz)'))
-                
-                # Method 2: Try clock speed fields (parse from string format)
-                if metrics.sclk_mhz is None:
-                    sclk_speed = gpu_data.get('sclk clock speed:')
-                    if sclk_speed and isinstance(sclk_speed, str):
-                        # Parse "(131Mhz)" format
-                        import re
-                        match = re.search(r'\((\d+)Mhz\)', sclk_speed)
-                        if match:
-                            metrics.sclk_mhz = float(match.group(1))
-                            debug_print(f"rocm-smi GPU {gpu_id}: SCLK from speed field: {metrics.sclk_mhz}MHz")
-                
-                if metrics.mclk_mhz is None:
-                    mclk_speed = gpu_data.get('mclk clock speed:')
-                    if mclk_speed and isinstance(mclk_speed, str):
-                        # Parse "(900Mhz)" format
-                        import re
-                        match = re.search(r'\((\d+)Mhz\)', mclk_speed)
-                        if match:
-                            metrics.mclk_mhz = float(match.group(1))
-                            debug_print(f"rocm-smi GPU {gpu_id}: MCLK from speed field: {metrics.mclk_mhz}MHz")
+                if EXTRA_FIELDS:
+                    # Clock frequencies - try the standard field names first
+                    for attr, key in _ROCM_SMI_CLOCK_FIELDS:
+                        setattr(metrics, attr, _safe_float(gpu_data.get(key)))
+                    
+                    # Then fall back to clock speed fields (parse from string format)
+                    if metrics.sclk_mhz is None:
+                        sclk_speed = gpu_data.get('sclk clock speed:')
+                        if sclk_speed and isinstance(sclk_speed, str):
+                            # Parse "(131Mhz)" format
+                            match = re.search(r'\((\d+)Mhz\)', sclk_speed)
+                            if match:
+                                metrics.sclk_mhz = float(match.group(1))
+                                if DEBUG_MODE:
+                                    debug_print(f"rocm-smi GPU {gpu_id}: SCLK from speed field: {metrics.sclk_mhz}MHz")
+                    
+                    if metrics.mclk_mhz is None:
+                        mclk_speed = gpu_data.get('mclk clock speed:')
+                        if mclk_speed and isinstance(mclk_speed, str):
+                            # Parse "(900Mhz)" format
+                            match = re.search(r'\((\d+)Mhz\)', mclk_speed)
+                            if match:
+                                metrics.mclk_mhz = float(match.group(1))
+                                if DEBUG_MODE:
+                                    debug_print(f"rocm-smi GPU {gpu_id}: MCLK from speed field: {metrics.mclk_mhz}MHz")
                 
-                # Energy counter parsing - improved based on actual rocm-smi output
+                # Energy counter: first key that parses wins
                 energy_found = False
-                
-                # Method 1: Use "energy_accumulator" field (new format)
-                energy_counter = gpu_data.get('energy_accumulator')
-                if isinstance(energy_counter, (str, int, float)):
+                for key, resolution, cast in _ROCM_SMI_ENERGY_FIELDS:
+                    value = gpu_data.get(key)
+                    if value is None:
+                        continue
                     try:
-                        counter_value = int(energy_counter)
-                        metrics.energy_accumulator = counter_value
-                        metrics.counter_resolution = 15.259  # Default resolution
-                        energy_found = True
-                        debug_print(f"rocm-smi GPU {gpu_id}: Using 'energy_accumulator' = {counter_value}")
-                    except ValueError:
-                        pass
-                
-                # Method 2: Use "Energy counter" (raw counter value)
-                if not energy_found:
-                    energy_counter = gpu_data.get('Energy counter')
-                    if isinstance(energy_counter, (str, int, float)):
-                        try:
-                            counter_value = int(energy_counter)
-                            metrics.energy_accumulator = counter_value
-                            metrics.counter_resolution = 15.259  # Default resolution
-                            energy_found = True
-                            debug_print(f"rocm-smi GPU {gpu_id}: Using 'Energy counter' = {counter_value}")
-                        except ValueError:
-                            pass
+                        metrics.energy_accumulator = cast(value)
+                    except (TypeError, ValueError):
+                        continue
+                    metrics.counter_resolution = resolution
+                    energy_found = True
+                    if DEBUG_MODE:
+                        debug_print(f"rocm-smi GPU {gpu_id}: Using '{key}' = {metrics.energy_accumulator}")
+                    break
                 
-                # Method 3: Use formatted energy accumulator string
-                if not energy_found:
-                    energy_acc_key = 'energy_accumulator (15.259uJ (2^-16))'
-                    energy_acc_value = gpu_data.get(energy_acc_key)
-                    if isinstance(energy_acc_value, (str, int, float)):
-                        try:
-                            counter_value = int(energy_acc_value)
-                            metrics.energy_accumulator = counter_value
-                            metrics.counter_resolution = 15.259  # From the key name
-                            energy_found = True
-                            debug_print(f"rocm-smi GPU {gpu_id}: Using '{energy_acc_key}' = {counter_value}")
-                        except ValueError:
-                            pass
-                
-                # Method 4: Use "Accumulated Energy (uJ)" (already converted to microJoules)
-                if not energy_found:
-                    accumulated_energy = gpu_data.get('Accumulated Energy (uJ)')
-                    if isinstance(accumulated_energy, (str, float)):
-                        try:
-                            # This is already in microJoules, so we use resolution of 1.0
-                            energy_uj = float(accumulated_energy)
-                            metrics.energy_accumulator = int(energy_uj)
-                            metrics.counter_resolution = 1.0  # Already in uJ
-                            energy_found = True
-                            debug_print(f"rocm-smi GPU {gpu_id}: Using 'Accumulated Energy (uJ)' = {energy_uj}")
-                        except ValueError:
-                            pass
-                
-                if not energy_found:
+                if not energy_found and DEBUG_MODE:
                     debug_print(f"rocm-smi GPU {gpu_id}: No usable energy data found")
                     # Show what energy keys are available for debugging
                     energy_keys = [k for k in gpu_data.keys() if 'energy' in k.lower()]
@@ -403,33 +931,21 @@ class AMDGPUMonitor:
         except Exception as e:
             debug_print(f"rocm-smi error: {e}")
             return []
+        
+        finally:
+            # Never leave rocm-smi running behind us (timeout or Ctrl+C mid-read)
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
     
-    def _safe_float(self, value) -> Optional[float]:
-        """Safely convert value to float"""
-        if value is None or value == 'N/A':
-            return None
-        try:
-            return float(value)
-        except (ValueError, TypeError):
-            return None
-    
-    def _save_metrics(self, metrics_list: List[GPUMetrics], filename: str):
-        """Save metrics to file"""
-        with open(filename, 'a') as f:
-            for metrics in metrics_list:
-                metrics_dict = {
-                    'timestamp': metrics.timestamp,
-                    'gpu_id': metrics.gpu_id,
-                    'power_watts': metrics.power_watts,
-                    'temperature_celsius': metrics.temperature_celsius,
-                    'utilization_percent': metrics.utilization_percent,
-                    'vram_usage_percent': metrics.vram_usage_percent,
-                    'sclk_mhz': metrics.sclk_mhz,
-                    'mclk_mhz': metrics.mclk_mhz,
-                    'energy_accumulator': metrics.energy_accumulator,
-                    'counter_resolution': metrics.counter_resolution
-                }
-                f.write(json.dumps(metrics_dict) + '\n')
+    def _save_metrics(self, metrics_list: List[GPUMetrics], f: BinaryIO):
+        """Append metrics to an open data file, as one write() unless the OS takes it short"""
+        lines = [_metrics_json(metrics) for metrics in metrics_list]
+        lines.append(b'')
+        data = memoryview(b'\n'.join(lines))
+        # Raw (unbuffered) files may accept fewer bytes than asked; write the rest rather than truncate the record
+        while data:
+            data = data[f.write(data):]
     
     def _calculate_energy_consumption(self, initial_metrics: List[GPUMetrics], 
                                     final_metrics: List[GPUMetrics]) -> float:
@@ -459,87 +975,52 @@ class AMDGPUMonitor:
         
         return total_energy_wh
     
-    def _generate_report(self, filename: str, start_time: datetime, end_time: datetime,
+    def _generate_report(self, history: MetricsHistory, start_time: datetime, end_time: datetime, elapsed_ns: int,
                         initial_metrics: List[GPUMetrics], final_metrics: List[GPUMetrics],
-                        method: str):
+                        energy_window_ns: int, method: str):
         """Generate monitoring report"""
-        # Read all collected data and organize by timestamp
-        all_power = []  # Individual GPU power values
-        all_temp = []
-        all_util = []
-        timestamp_data = {}  # timestamp -> list of GPU data
-        
-        try:
-            with open(filename, 'r') as f:
-                gpu_ids = set()
-                for line in f:
-                    data = json.loads(line)
-                    gpu_ids.add(data.get('gpu_id', 0))
-                    timestamp = data.get('timestamp')
-                    
-                    if timestamp not in timestamp_data:
-                        timestamp_data[timestamp] = []
-                    timestamp_data[timestamp].append(data)
-                    
-                    if data.get('power_watts') is not None:
-                        try:
-                            all_power.append(float(data['power_watts']))
-                        except (ValueError, TypeError):
-                            debug_print(f"Invalid power value in file: {data['power_watts']} (type: {type(data['power_watts'])})")
-                    if data.get('temperature_celsius') is not None:
-                        try:
-                            all_temp.append(float(data['temperature_celsius']))
-                        except (ValueError, TypeError):
-                            debug_print(f"Invalid temperature value in file: {data['temperature_celsius']}")
-                    if data.get('utilization_percent') is not None:
-                        try:
-                            all_util.append(float(data['utilization_percent']))
-                        except (ValueError, TypeError):
-                            debug_print(f"Invalid utilization value in file: {data['utilization_percent']}")
-                
-                gpu_count = len(gpu_ids)
-                
-        except FileNotFoundError:
-            debug_print(f"Data file not found: {filename}")
-            return
-        
-        # Calculate total system power per timestamp
-        total_power_per_timestamp = []
-        for timestamp, gpu_data_list in timestamp_data.items():
-            # Ensure all power values are numeric before summing
-            numeric_powers = []
-            for d in gpu_data_list:
-                power_val = d.get('power_watts')
-                if power_val is not None:
-                    try:
-                        numeric_powers.append(float(power_val))
-                    except (ValueError, TypeError):
-                        debug_print(f"Invalid power value in data: {power_val} (type: {type(power_val)})")
-            
-            if numeric_powers:  # Only include if we have valid power data
-                total_power_per_timestamp.append(sum(numeric_powers))
+        # Sampled values were aggregated as they were saved; the data file is not re-read
+        power_stats = history.power_stats
+        total_power_stats = history.total_power_stats
+        temp_stats = history.temperature
+        util_stats = history.utilization
+        interval_stats = history.interval
+        gpu_count = len(history.gpu_ids)
         
         # Power statistics (individual GPU values and system totals)
-        max_individual_gpu_power = max(all_power, default=0)
-        min_individual_gpu_power = min(all_power, default=0)
-        avg_individual_gpu_power = sum(all_power) / len(all_power) if all_power else 0
+        max_individual_gpu_power = power_stats.maximum
+        min_individual_gpu_power = power_stats.minimum
+        avg_individual_gpu_power = power_stats.mean
+        
+        max_total_system_power = total_power_stats.maximum
+        min_total_system_power = total_power_stats.minimum
+        avg_total_system_power = total_power_stats.mean
+        stdev_total_system_power = total_power_stats.stdev
+        energy_power_stats = history.energy_power_stats
+        per_gpu_power = '\n'.join(
+            f"  GPU {gpu_id}: {stats.mean:.1f} W avg, {stats.minimum:.1f} - {stats.maximum:.1f} W range, {stats.stdev:.1f} W std dev"
+            for gpu_id, stats in sorted(history.gpu_power_stats.items())) or "  No power data"
         
-        max_total_system_power = max(total_power_per_timestamp, default=0)
-        min_total_system_power = min(total_power_per_timestamp, default=0)
-        avg_total_system_power = sum(total_power_per_timestamp) / len(total_power_per_timestamp) if total_power_per_timestamp else 0
+        p50_total_system_power, p95_total_system_power, p99_total_system_power = _percentiles(history.total_power)
+        p50_individual_gpu_power, p95_individual_gpu_power, p99_individual_gpu_power = _percentiles(history.power)
         
         # Calculate statistics
-        duration = end_time - start_time
+        # Elapsed time comes from the monotonic clock; the datetimes are only for display
+        duration_seconds = elapsed_ns / 1e9
+        duration = timedelta(microseconds=elapsed_ns // 1000)
         total_energy_wh = self._calculate_energy_consumption(initial_metrics, final_metrics)
         
+        # The counters were read at the initial and final samples rather than at start and stop,
+        # so energy rates are taken over the (monotonic) span between those samples
+        duration_hours = duration_seconds / 3600
+        energy_window_hours = energy_window_ns / 3.6e12 if energy_window_ns > 0 else duration_hours  # 3.6e12 ns per hour
+        
         # Calculate expected energy based on average power for validation
-        duration_hours = duration.total_seconds() / 3600
-        duration_seconds = duration.total_seconds()
-        expected_energy_wh = avg_total_system_power * duration_hours if total_power_per_timestamp else 0
+        expected_energy_wh = avg_total_system_power * energy_window_hours
         
         # Convert energy to different units
         total_energy_j = total_energy_wh * 3600  # 1 Wh = 3600 J
-        avg_power_from_energy = total_energy_wh / duration_hours if duration_hours > 0 else 0
+        avg_power_from_energy = total_energy_wh / energy_window_hours if energy_window_hours > 0 else 0
         
         # Generate report
         report = f"""
@@ -549,24 +1030,31 @@ Duration: {duration}
 Start: {start_time.strftime('%Y-%m-%d %H:%M:%S')}
 End: {end_time.strftime('%Y-%m-%d %H:%M:%S')}
 GPUs: {gpu_count}
+Sampling Interval: {self.sampling_interval}s configured, {interval_stats.mean:.3f}s effective avg ({interval_stats.maximum:.3f}s max)
 
 System Power Statistics:
   Max Total: {max_total_system_power:.1f} W
   Min Total: {min_total_system_power:.1f} W
   Avg Total: {avg_total_system_power:.1f} W
+  Std Dev Total: {stdev_total_system_power:.1f} W
+  P50/P95/P99 Total: {p50_total_system_power:.1f} / {p95_total_system_power:.1f} / {p99_total_system_power:.1f} W
 
 Individual GPU Power Statistics:
   Max Single GPU: {max_individual_gpu_power:.1f} W
   Min Single GPU: {min_individual_gpu_power:.1f} W
   Avg Single GPU: {avg_individual_gpu_power:.1f} W
+  P50/P95/P99 Single GPU: {p50_individual_gpu_power:.1f} / {p95_individual_gpu_power:.1f} / {p99_individual_gpu_power:.1f} W
+
+Per-GPU Power Statistics:
+{per_gpu_power}
 
 Temperature Statistics:
-  Max: {max(all_temp, default=0):.1f} °C
-  Avg: {sum(all_temp)/len(all_temp) if all_temp else 0:.1f} °C
+  Max: {temp_stats.maximum:.1f} °C
+  Avg: {temp_stats.mean:.1f} °C
 
 Utilization Statistics:
-  Max: {max(all_util, default=0):.1f} %
-  Avg: {sum(all_util)/len(all_util) if all_util else 0:.1f} %
+  Max: {util_stats.maximum:.1f} %
+  Avg: {util_stats.mean:.1f} %
 
 Energy Consumption:
   Total Energy: {total_energy_j:.0f} J ({total_energy_wh:.6f} Wh, {total_energy_wh/1000:.9f} kWh)
@@ -574,11 +1062,13 @@ Energy Consumption:
   Expected Power (from sampled power): {avg_total_system_power:.1f} W
   Measurement accuracy: {(total_energy_wh/expected_energy_wh*100) if expected_energy_wh > 0 else 0:.1f}%
   Duration: {duration_seconds:.1f} seconds
+  Energy counter window: {energy_window_hours * 3600:.1f} seconds
   Energy data available: {len(initial_metrics)} GPUs
 
 Energy Counter vs Sampled Power Comparison:
   Energy Counter Method: {total_energy_wh:.6f} Wh ({avg_power_from_energy:.1f} W avg)
   Power Sampling Method: {expected_energy_wh:.6f} Wh ({avg_total_system_power:.1f} W avg)
+  Per-Tick Counter Deltas: {energy_power_stats.mean:.1f} W avg, {energy_power_stats.minimum:.1f} - {energy_power_stats.maximum:.1f} W range ({energy_power_stats.count} ticks)
   Difference: {abs(avg_power_from_energy - avg_total_system_power):.1f} W ({abs(avg_power_from_energy - avg_total_system_power)/avg_total_system_power*100 if avg_total_system_power > 0 else 0:.1f}%)
 """
         
@@ -591,6 +1081,150 @@ Energy Counter vs Sampled Power Comparison:
             f.write(report)
         info_print(f"Report saved: {report_filename}")
     
+    def _format_status(self, method: str, metrics: List[GPUMetrics]) -> str:
+        """Format a one-line power summary for a sampled tick"""
+        # Collectors only ever store a float or None, so no re-validation is needed here;
+        # one pass sums and counts without building an intermediate list
+        total_power = 0.0
+        with_data = 0
+        for m in metrics:
+            power = m.power_watts
+            if power is not None:
+                total_power += power
+                with_data += 1
+        return _STATUS_FORMAT(method, len(metrics), total_power, with_data)
+    
+    def _next_interval(self, tick: List[Tuple[str, List[GPUMetrics]]]) -> float:
+        """Interval until the next sample: doubles per idle tick (up to 16x, capped at 30s), resets on activity"""
+        idle = bool(tick)
+        for method, metrics in tick:
+            for m in metrics:
+                key = (method, m.gpu_id)
+                if m.utilization_percent:
+                    idle = False
+                if m.power_watts is not None:
+                    prev_power = self._prev_power.get(key)
+                    if prev_power is None or abs(m.power_watts - prev_power) >= 1.0:
+                        idle = False
+                    self._prev_power[key] = m.power_watts
+        
+        if not idle:
+            if self._idle_streak:
+                debug_print("GPU activity detected, sampling interval back to %ss", self.sampling_interval)
+            self._idle_streak = 0
+            return self.sampling_interval
+        
+        self._idle_streak += 1
+        backoff = self.sampling_interval * 2 ** min(self._idle_streak, 4)
+        interval = min(backoff, max(self.sampling_interval, 30.0))
+        debug_print("GPUs idle for %d tick(s), sampling interval %ss", self._idle_streak, interval)
+        return interval
+    
+    def _enqueue_tick(self, ticks: queue.Queue, tick: Tuple[int, List[Tuple[str, List[GPUMetrics]]]]):
+        """Hand a tick to the consumer without blocking, dropping the oldest if it falls behind"""
+        try:
+            ticks.put_nowait(tick)
+        except queue.Full:
+            try:
+                ticks.get_nowait()
+                debug_print("Output queue full, dropped oldest sample")
+            except queue.Empty:
+                pass
+            ticks.put_nowait(tick)
+    
+    def _consumer_loop(self, ticks: queue.Queue, files: Dict[str, BinaryIO],
+                       histories: Dict[str, MetricsHistory]):
+        """Consumer thread body: run _consume, stopping the monitor if it dies"""
+        try:
+            self._consume(ticks, files, histories)
+        except BaseException as e:
+            # Without the consumer nothing more is saved or aggregated; stop sampling rather than carry on silently
+            info_print("Error: output thread failed (%s: %s); stopping the monitor", type(e).__name__, e)
+            self.stop()
+            raise
+    
+    def _consume(self, ticks: queue.Queue, files: Dict[str, BinaryIO],
+                 histories: Dict[str, MetricsHistory]):
+        """Save and print ticks from the sampling loop until a None sentinel arrives"""
+        failed = set()  # Methods whose data file could not be written
+        while True:
+            # Take whatever has queued up behind the first tick so a backlog goes out as
+            # one write per data file; the sentinel is always the last item put
+            batch = [ticks.get()]
+            while len(batch) < 64:
+                try:
+                    batch.append(ticks.get_nowait())
+                except queue.Empty:
+                    break
+            stop = batch[-1] is None
+            if stop:
+                batch.pop()
+            
+            pending = {}
+            status = []
+            for tick_ns, tick in batch:
+                for method, metrics in tick:
+                    pending.setdefault(method, []).extend(metrics)
+                    histories[method].add(metrics, tick_ns)
+                    if not QUIET_MODE:
+                        status.append(self._format_status(method, metrics))
+            for method, metrics in pending.items():
+                if method in failed:
+                    continue
+                try:
+                    self._save_metrics(metrics, files[method])
+                except OSError as e:
+                    # Keep aggregating for the report, but say the data file is incomplete
+                    failed.add(method)
+                    info_print("Error: writing %s data failed (%s); later samples are not saved to %s",
+                               method, e, files[method].name)
+            if status:
+                _write_lines('\n'.join(status))
+            
+            if stop:
+                return
+    
+    def _pick_methods(self, methods: List[str]) -> List[str]:
+        """Time one sample from each method and keep only the fastest one that reports every
+        compared field the others do; keep them all when none does"""
+        latencies = {}
+        coverage = {}
+        for method in methods:
+            getter = self._get_amdsmi_metrics if method == 'amdsmi' else self._get_rocm_smi_metrics
+            start = time.perf_counter()
+            metrics = getter()
+            elapsed = time.perf_counter() - start
+            if metrics:
+                latencies[method] = elapsed
+                coverage[method] = {attr for attr in _PROBE_FIELDS
+                                    if all(getattr(m, attr) is not None for m in metrics)}
+            debug_print("%s: probe sample took %.1f ms, reports %s", method, elapsed * 1000,
+                        ', '.join(sorted(coverage.get(method, ()))) or 'nothing')
+        if not latencies:
+            return methods
+        reported = set().union(*coverage.values())
+        complete = [method for method in latencies if coverage[method] == reported]
+        if not complete:
+            info_print("Sampling with all methods: none reports every field the others do")
+            return methods
+        fastest = min(complete, key=latencies.get)
+        info_print("Sampling with %s only (fastest complete backend; AMD_GPU_MONITOR_FORCE_BOTH=true keeps both)", fastest)
+        return [fastest]
+    
+    def _collect_all(self, pool: Optional[ThreadPoolExecutor], getters: List, *args) -> List[List[GPUMetrics]]:
+        """Call every getter with args, running all but the first on pool (when there is one)"""
+        futures = [pool.submit(getter, *args) for getter in getters[1:]] if pool is not None else []
+        results = [getters[0](*args)]
+        if futures:
+            results.extend(future.result() for future in futures)
+        else:
+            results.extend(getter(*args) for getter in getters[1:])
+        return results
+    
+    def stop(self):
+        """Ask monitor() to finish after the current tick and write its reports (also honoured during its startup)"""
+        self._stop.set()
+    
     def monitor(self, use_amdsmi: bool = True, use_rocm_smi: bool = True):
         """Start monitoring GPUs"""
         # Apply environment variable overrides
@@ -612,68 +1246,199 @@ Energy Counter vs Sampled Power Comparison:
             info_print("No monitoring methods enabled!")
             return
         
+        if len(methods) > 1 and not FORCE_BOTH_METHODS:
+            methods = self._pick_methods(methods)
+        
         # Initialize data collection
         start_time = datetime.now()
-        filenames = {}
-        initial_metrics = {}
+        start_ns = time.monotonic_ns()
+        files = {}
+        
+        # With several methods, all but the first are collected on worker threads while the first
+        # is sampled here; the SMI calls release the GIL, so a tick costs the slowest method, not the sum
+        pool = ThreadPoolExecutor(max_workers=len(methods) - 1) if len(methods) > 1 else None
+        getters = [self._get_amdsmi_metrics if method == 'amdsmi' else self._get_rocm_smi_metrics
+                   for method in methods]
+        snapshots = [self._get_amdsmi_metrics if method == 'amdsmi' else self._get_rocm_smi_energy_snapshot
+                     for method in methods]
         
         for method in methods:
             filename = os.path.join(self.output_dir, 
                                   f"gpu_metrics_{method}_{start_time.strftime('%Y%m%d_%H%M%S')}.jsonl")
-            filenames[method] = filename
-            
-            # Get initial metrics for energy calculation
-            if method == 'amdsmi':
-                initial_metrics[method] = self._get_amdsmi_metrics()
-            else:
-                initial_metrics[method] = self._get_rocm_smi_metrics()
-            
+            # Keep the data file open for the whole run; unbuffered, so each batch lands as one O_APPEND write
+            files[method] = open(filename, 'ab', buffering=0)
+        
+        # Get initial metrics for energy calculation
+        initial_ns = time.monotonic_ns()
+        initial_metrics = dict(zip(methods, self._collect_all(pool, snapshots)))
+        for method in methods:
             debug_print(f"Initial {method} metrics: {len(initial_metrics[method])} GPUs")
         
         info_print(f"\nMonitoring started with methods: {', '.join(methods)}")
         info_print("Press Ctrl+C to stop monitoring\n")
         
+        # Saving and printing run on a consumer thread so output I/O never delays sampling
+        ticks = queue.Queue(maxsize=1024)
+        histories = {method: MetricsHistory() for method in methods}
+        consumer = threading.Thread(target=self._consumer_loop, args=(ticks, files, histories), daemon=True)
+        consumer.start()
+        
+        # The first Ctrl+C only sets the stop event, so the loop ends between ticks instead of a
+        # KeyboardInterrupt unwinding out of whichever collector call was running; it also puts the
+        # previous handler back, so a second Ctrl+C still breaks out of a collector that is stuck
+        sigint_handler = None
+        if threading.current_thread() is threading.main_thread():
+            sigint_handler = signal.getsignal(signal.SIGINT)
+            if sigint_handler is None:
+                # A handler not installed from Python; fall back to the KeyboardInterrupt one
+                sigint_handler = signal.default_int_handler
+            
+            def on_sigint(signum, frame):
+                signal.signal(signal.SIGINT, sigint_handler)
+                self.stop()
+            
+            signal.signal(signal.SIGINT, on_sigint)
+        
+        # Ticks are scheduled on absolute monotonic deadlines so sampling cost doesn't accumulate as drift
+        next_tick = time.monotonic()
+        overruns = 0
+        on_time = 0
+        slowest = 0.0  # Longest tick cost in the current on-time streak
+        backoff = 1  # Overrun back-off multiplier on the configured interval
+        
+        # Everything the loop touches per tick is bound to a local once, sparing an attribute lookup each time
+        stopped = self._stop.is_set
+        wait = self._stop.wait
+        monotonic = time.monotonic
+        monotonic_ns = time.monotonic_ns
+        time_ns = time.time_ns
+        collect_all = self._collect_all
+        enqueue_tick = self._enqueue_tick
+        next_interval = self._next_interval
+        base_interval = interval = self.sampling_interval
+        # Latest (tick_ns, sample) per method; the final energy reading comes from here instead of a post-loop SMI call
+        last_sample = {}
+        remember = last_sample.update
+        
+        # Pin only this thread (pid 0 is the calling thread); the consumer and pool workers already exist and stay unpinned
+        prev_affinity = None
+        if MONITOR_CPU is not None:
+            try:
+                prev_affinity = os.sched_getaffinity(0)
+                os.sched_setaffinity(0, {MONITOR_CPU})
+                debug_print("Sampling thread pinned to CPU %d", MONITOR_CPU)
+            except (AttributeError, OSError, ValueError) as e:
+                prev_affinity = None
+                info_print("Could not pin sampling thread to CPU %d: %s", MONITOR_CPU, e)
+        
+        interrupted = False
         try:
-            while True:
-                for method in methods:
-                    if method == 'amdsmi':
-                        metrics = self._get_amdsmi_metrics()
-                    else:
-                        metrics = self._get_rocm_smi_metrics()
-                    
-                    if metrics:
-                        self._save_metrics(metrics, filenames[method])
-                        
-                        # Print current status
-                        valid_power = [m.power_watts for m in metrics if m.power_watts is not None]
-                        # Ensure all power values are numeric
-                        numeric_power = []
-                        for power in valid_power:
-                            try:
-                                numeric_power.append(float(power))
-                            except (ValueError, TypeError):
-                                debug_print(f"Invalid power value: {power} (type: {type(power)})")
-                        
-                        total_power = sum(numeric_power)
-                        info_print(f"{method}: {len(metrics)} GPUs, Total Power: {total_power:.1f}W ({len(numeric_power)} with data)")
+            while not stopped():
+                # One wall-clock timestamp per tick, shared by every method and GPU, for the data files;
+                # the monotonic stamp is what intervals and energy rates are computed from
+                timestamp_ns = time_ns()
+                tick_ns = monotonic_ns()
+                tick = [(method, metrics) for method, metrics
+                        in zip(methods, collect_all(pool, getters, timestamp_ns)) if metrics]
                 
-                time.sleep(self.sampling_interval)
+                if tick:
+                    remember((method, (tick_ns, metrics)) for method, metrics in tick)
+                    enqueue_tick(ticks, (tick_ns, tick))
                 
+                # The overrun back-off is a floor under the adaptive interval, not a multiplier on it
+                next_tick += max(next_interval(tick), interval) if ADAPTIVE_SAMPLING else interval
+                now = monotonic()
+                delay = next_tick - now
+                if delay > 0:
+                    overruns = 0
+                    if backoff > 1:
+                        on_time += 1
+                        slowest = max(slowest, now - tick_ns / 1e9)
+                        if on_time >= _OVERRUN_RECOVERY_TICKS:
+                            lower = base_interval * (backoff // 2)
+                            if slowest <= lower * _OVERRUN_RECOVERY_HEADROOM:
+                                # Ticks fit the lower interval again; step back towards the configured one
+                                backoff //= 2
+                                interval = lower
+                                info_print("Sampling keeps up again, interval lowered to %ss", interval)
+                            on_time = 0
+                            slowest = 0.0
+                    wait(delay)
+                else:
+                    # Sampling overran the interval; restart the cadence now rather than catch up
+                    next_tick = now
+                    overruns += 1
+                    on_time = 0
+                    slowest = 0.0
+                    debug_print("Sampling overran the interval by %.3fs", -delay)
+                    if overruns >= 3:
+                        overruns = 0
+                        if backoff < _MAX_OVERRUN_BACKOFF:
+                            # The collectors can't keep up; back the interval off instead of running flat out
+                            backoff *= 2
+                            interval = base_interval * backoff
+                            info_print("Warning: sampling kept overrunning, interval raised to %ss", interval)
+        
         except KeyboardInterrupt:
-            info_print("\nMonitoring stopped.")
+            # Second Ctrl+C while a collector was blocked; still write out what was sampled
+            interrupted = True
         
         finally:
+            elapsed_ns = time.monotonic_ns() - start_ns
             end_time = datetime.now()
+            # Cleared only once this run is over, so a stop() that came in during startup isn't lost
+            self._stop.clear()
+            if sigint_handler is not None:
+                signal.signal(signal.SIGINT, sigint_handler)
+            if prev_affinity is not None:
+                try:
+                    os.sched_setaffinity(0, prev_affinity)
+                except (AttributeError, OSError, ValueError) as e:
+                    # E.g. the cpuset changed during the run; not worth losing the reports over
+                    info_print("Could not restore the CPU affinity: %s", e)
             
-            # Generate reports
-            for method in methods:
-                if method == 'amdsmi':
-                    final_metrics = self._get_amdsmi_metrics()
+            # Let the consumer drain what was sampled before closing the data files and reporting
+            if consumer.is_alive():
+                ticks.put(None)
+                consumer.join()
+            for f in files.values():
+                f.close()
+            # Only after the consumer is done, so this never lands mid-way through a status line
+            info_print("\nMonitoring stopped.")
+            
+            # Generate reports; a snapshot is only taken for methods whose last sample can't close the energy
+            # window: none yet, or rocm-smi energy that comes from the CLI (same test as the initial snapshot,
+            # so both ends share GPU ids and counter resolution). After a second Ctrl+C a collector may still
+            # be stuck, so no further SMI call is made then and the energy window may stay open
+            final_metrics = {}
+            final_ns = {}
+            missing = []
+            for method, snapshot in zip(methods, snapshots):
+                sample_ns, sample = last_sample.get(method, (0, None))
+                if sample and not (method == 'rocm_smi' and self._needs_cli_energy(sample)):
+                    final_metrics[method] = sample
+                    final_ns[method] = sample_ns
+                elif interrupted:
+                    final_metrics[method] = sample or []
+                    final_ns[method] = sample_ns
                 else:
-                    final_metrics = self._get_rocm_smi_metrics()
-                
-                self._generate_report(filenames[method], start_time, end_time,
-                                    initial_metrics[method], final_metrics, method)
+                    missing.append((method, self._get_rocm_smi_cli_metrics if sample else snapshot))
+            if missing:
+                closing_ns = time.monotonic_ns()
+                final_metrics.update(zip((method for method, _ in missing),
+                                         self._collect_all(pool, [snapshot for _, snapshot in missing])))
+                final_ns.update((method, closing_ns) for method, _ in missing)
+            if pool is not None:
+                # Don't wait on a worker still blocked in a collector call
+                pool.shutdown(wait=False, cancel_futures=True)
+            for method in methods:
+                self._generate_report(histories[method], start_time, end_time, elapsed_ns,
+                                    initial_metrics[method], final_metrics[method],
+                                    final_ns[method] - initial_ns, method)
+        
+        if interrupted:
+            # The reports are out; hand the forced stop on to the caller
+            raise KeyboardInterrupt
 
 def main():
     """Main function"""
@@ -699,36 +1464,71 @@ def main():
     else:
         config_info.append("ROCm-SMI: Disabled")
     
+    if EXTRA_FIELDS:
+        config_info.append("Extra fields (clocks): Enabled")
+    else:
+        config_info.append("Extra fields (clocks): Disabled")
+    
     config_info.append(f"Sampling interval: {SAMPLING_INTERVAL}s")
     
+    if ADAPTIVE_SAMPLING:
+        config_info.append("Adaptive sampling: ON")
+    else:
+        config_info.append("Adaptive sampling: OFF")
+    
+    if FORCE_BOTH_METHODS:
+        config_info.append("Both methods: Forced")
+    else:
+        config_info.append("Both methods: Auto (fastest only)")
+    
+    if MONITOR_CPU is not None:
+        config_info.append(f"Sampling thread CPU: {MONITOR_CPU}")
+    else:
+        config_info.append("Sampling thread CPU: Unpinned")
+    
     if not QUIET_MODE:
-        print("=== AMD GPU Monitor Configuration ===")
-        for info in config_info:
-            print(f"  {info}")
-        print("")
+        # Collect the banner and emit it with a single write
+        banner = ["=== AMD GPU Monitor Configuration ==="]
+        banner.extend(f"  {info}" for info in config_info)
+        banner.append("")
         
         # Recommendations based on sampling interval
         if SAMPLING_INTERVAL < 0.5:
-            print("WARNING: High frequency sampling may cause significant CPU overhead")
+            banner.append("WARNING: High frequency sampling may cause significant CPU overhead")
         elif SAMPLING_INTERVAL >= 5.0:
-            print("INFO: Low frequency sampling may miss short power spikes")
+            banner.append("INFO: Low frequency sampling may miss short power spikes")
         
-        print("Environment variable options:")
+        banner.append("Environment variable options:")
         if not DEBUG_MODE:
-            print("   AMD_GPU_MONITOR_DEBUG=true (enable debug messages)")
+            banner.append("   AMD_GPU_MONITOR_DEBUG=true (enable debug messages)")
         if not QUIET_MODE:
-            print("   AMD_GPU_MONITOR_QUIET=true (suppress info messages)")
+            banner.append("   AMD_GPU_MONITOR_QUIET=true (suppress info messages)")
         if ENABLE_AMDSMI:
-            print("   AMD_GPU_MONITOR_DISABLE_AMDSMI=true (disable AMDSMI)")
+            banner.append("   AMD_GPU_MONITOR_DISABLE_AMDSMI=true (disable AMDSMI)")
         if ENABLE_ROCM_SMI:
-            print("   AMD_GPU_MONITOR_DISABLE_ROCM_SMI=true (disable ROCm-SMI)")
-        print(f"   AMD_GPU_MONITOR_INTERVAL=<seconds> (current: {SAMPLING_INTERVAL}s)")
-        print("")
+            banner.append("   AMD_GPU_MONITOR_DISABLE_ROCM_SMI=true (disable ROCm-SMI)")
+        if not EXTRA_FIELDS:
+            banner.append("   AMD_GPU_MONITOR_EXTRA_FIELDS=true (collect sclk/mclk clock frequencies)")
+        banner.append(f"   AMD_GPU_MONITOR_INTERVAL=<seconds> (current: {SAMPLING_INTERVAL}s)")
+        if not ADAPTIVE_SAMPLING:
+            banner.append("   AMD_GPU_MONITOR_ADAPTIVE=true (back off sampling while GPUs are idle)")
+        if not FORCE_BOTH_METHODS:
+            banner.append("   AMD_GPU_MONITOR_FORCE_BOTH=true (sample with amdsmi and ROCm-SMI side by side)")
+        if MONITOR_CPU is None:
+            banner.append("   AMD_GPU_MONITOR_CPU=<core> (pin the sampling thread to one CPU, Linux only)")
+        banner.append("")
+        sys.stdout.write("\n".join(banner) + "\n")
     
     monitor = AMDGPUMonitor()
     
     # Monitor with enabled methods
-    monitor.monitor(use_amdsmi=ENABLE_AMDSMI, use_rocm_smi=ENABLE_ROCM_SMI)
+    try:
+        monitor.monitor(use_amdsmi=ENABLE_AMDSMI, use_rocm_smi=ENABLE_ROCM_SMI)
+    except KeyboardInterrupt:
+        # Forced stop: a collector thread may still be blocked in a driver call, and interpreter
+        # exit would join it, so leave without waiting (128 + SIGINT, as for an uncaught Ctrl+C)
+        sys.stdout.flush()
+        os._exit(130)
 
 if __name__ == "__main__":
     main()